@@ -106,16 +106,15 @@ class AvatarBannerUpdater(commands.Cog):
                 'Content-Type': 'application/json',
             }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.patch('https://discord.com/api/v10/users/@me', headers=headers, json=payload) as response:
-                    response_text = await response.text()
-                    if response.status == 200:
-                        await interaction.followup.send("<a:sukoon_greendot:1322894177775783997> Bot banner updated successfully!")
-                        logging.info(f"Bot banner updated by user {interaction.user.name}")
-                        self.last_banner_update = current_time
-                    else:
-                        await interaction.followup.send(f"Failed to update banner: {response_text}", ephemeral=True)
-                        logging.error(f"<a:sukoon_reddot:1322894157794119732> Failed to update banner: {response_text}")
+            async with self.bot.http_session.patch('https://discord.com/api/v10/users/@me', headers=headers, json=payload) as response:
+                response_text = await response.text()
+                if response.status == 200:
+                    await interaction.followup.send("<a:sukoon_greendot:1322894177775783997> Bot banner updated successfully!")
+                    logging.info(f"Bot banner updated by user {interaction.user.name}")
+                    self.last_banner_update = current_time
+                else:
+                    await interaction.followup.send(f"Failed to update banner: {response_text}", ephemeral=True)
+                    logging.error(f"<a:sukoon_reddot:1322894157794119732> Failed to update banner: {response_text}")
         except aiohttp.ClientError as e:
             await interaction.followup.send(f"An error occurred: {e}", ephemeral=True)
             logging.error(f"Error updating banner: {e}")
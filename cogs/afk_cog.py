@@ -177,12 +177,14 @@ class AFK(commands.Cog):
             return f"{int(seconds)} seconds ago"
 
     @commands.Cog.listener()
-    async def on_member_remove(self, member):
+    async def on_raw_member_remove(self, payload):
         """Automatically remove AFK status if a user leaves the server."""
+        # Raw event: member_remove is only dispatched for cached members
+        user_id = payload.user.id
         try:
-            await self.remove_afk_status(member.id)
+            await self.remove_afk_status(user_id)
         except Exception as e:
-            print(f"Error removing AFK status for {member.id} on member remove: {e}")
+            print(f"Error removing AFK status for {user_id} on member remove: {e}")
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -1,81 +1,182 @@
 import asyncio
 import discord
-from discord.ext import commands
-import json
+import logging
+from discord.ext import commands, tasks
+import orjson
 import aiosqlite
 from datetime import datetime
 import random
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from discord import app_commands
 
+# Regex patterns that are answered without running the regex engine
+TRIVIAL_REGEX_PATTERNS = ('.', '.*', '.+')
+
+# Seconds between batched writes of trigger usage logs
+LOG_FLUSH_INTERVAL = 2
+LOG_QUEUE_MAX = 10000  # Oldest unwritten log entries are dropped past this
+
 
 class AutoResponderCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.db_path = 'autoresponder.db'
-        self.cache = {}
+        self.compiled: Dict[int, re.Pattern] = {}
+        self.triggers: List[Dict] = []
+        # Per-match-type indexes rebuilt from self.triggers on every change
+        self.exact_triggers: Dict[str, List[Dict]] = {}
+        self.exact_triggers_lower: Dict[str, List[Dict]] = {}
+        self.partial_triggers: List[Dict] = []
+        self.partial_matcher: Optional[re.Pattern] = None
+        self.regex_triggers: List[Dict] = []
+        self._log_queue: List[Tuple[int, int, int, str]] = []
+        self.db: Optional[aiosqlite.Connection] = None
+        self._ready = asyncio.Event()
         asyncio.create_task(self.init_db())
 
     async def init_db(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS triggers (
-                    id INTEGER PRIMARY KEY,
-                    pattern TEXT NOT NULL,
-                    match_type TEXT NOT NULL,
-                    case_sensitive BOOLEAN,
-                    responses TEXT NOT NULL,
-                    cooldown INTEGER DEFAULT 0,
-                    channels TEXT,
-                    roles TEXT,
-                    blacklist_users TEXT,
-                    whitelist_users TEXT,
-                    creator_id INTEGER,
-                    created_at TIMESTAMP
-                )
-            ''')
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS logs (
-                    id INTEGER PRIMARY KEY,
-                    trigger_id INTEGER,
-                    user_id INTEGER,
-                    channel_id INTEGER,
-                    timestamp TIMESTAMP,
-                    FOREIGN KEY (trigger_id) REFERENCES triggers (id)
-                )
-            ''')
-            await db.commit()
+        self.db = await aiosqlite.connect(self.db_path)
+        db = self.db
+        await db.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-64000;
+        ''')
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS triggers (
+                id INTEGER PRIMARY KEY,
+                pattern TEXT NOT NULL,
+                match_type TEXT NOT NULL,
+                case_sensitive BOOLEAN,
+                responses TEXT NOT NULL,
+                cooldown INTEGER DEFAULT 0,
+                channels TEXT,
+                roles TEXT,
+                blacklist_users TEXT,
+                whitelist_users TEXT,
+                creator_id INTEGER,
+                created_at TIMESTAMP
+            )
+        ''')
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY,
+                trigger_id INTEGER,
+                user_id INTEGER,
+                channel_id INTEGER,
+                timestamp TIMESTAMP,
+                FOREIGN KEY (trigger_id) REFERENCES triggers (id)
+            )
+        ''')
+        await db.commit()
+
+        async with db.execute('SELECT * FROM triggers') as cursor:
+            rows = await cursor.fetchall()
+
+        triggers = []
+        for row in rows:
+            trigger = self.row_to_trigger(row)
+            self.prepare_trigger(trigger)
+            triggers.append(trigger)
+        self.triggers = triggers
+        self.rebuild_matchers()
+        self._ready.set()
+        self.flush_logs.start()
+
+    def row_to_trigger(self, row) -> Dict:
+        """Build a trigger dict from a row of the triggers table."""
+        return {
+            'id': row[0],
+            'pattern': row[1],
+            'match_type': row[2],
+            'case_sensitive': row[3],
+            'responses': orjson.loads(row[4]),
+            'cooldown': row[5],
+            'channels': orjson.loads(row[6]) if row[6] else [],
+            'roles': orjson.loads(row[7]) if row[7] else [],
+            'blacklist_users': orjson.loads(row[8]) if row[8] else [],
+            'whitelist_users': orjson.loads(row[9]) if row[9] else [],
+            'creator_id': row[10],
+            'created_at': datetime.fromisoformat(row[11])
+        }
+
+    async def cog_unload(self):
+        """Stop the log flusher, write out pending log entries and close the database."""
+        self.flush_logs.cancel()
+        if self.db:
+            try:
+                await self.write_pending_logs()
+            finally:
+                await self.db.close()
 
-    async def get_trigger(self, pattern: str) -> Optional[Dict]:
-        if pattern in self.cache:
-            return self.cache[pattern]
-
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute('SELECT * FROM triggers WHERE pattern = ?',
-                                  (pattern, )) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    trigger = {
-                        'id': row[0],
-                        'pattern': row[1],
-                        'match_type': row[2],
-                        'case_sensitive': row[3],
-                        'responses': json.loads(row[4]),
-                        'cooldown': row[5],
-                        'channels': json.loads(row[6]) if row[6] else [],
-                        'roles': json.loads(row[7]) if row[7] else [],
-                        'blacklist_users':
-                        json.loads(row[8]) if row[8] else [],
-                        'whitelist_users':
-                        json.loads(row[9]) if row[9] else [],
-                        'creator_id': row[10],
-                        'created_at': datetime.fromisoformat(row[11])
-                    }
-                    self.cache[pattern] = trigger
-                    return trigger
-        return None
+    def prepare_trigger(self, trigger: Dict):
+        """
+        Precompute the lowered pattern and single text response, freeze the
+        id lists into sets for O(1) membership checks and compile regex
+        triggers once.
+        """
+        for key in ('channels', 'roles', 'blacklist_users', 'whitelist_users'):
+            trigger[key] = frozenset(trigger[key])
+
+        # A single text response is sent as-is without choosing or building one
+        responses = trigger['responses']
+        if len(responses) == 1 and responses[0]['type'] == 'text':
+            trigger['_fast_response'] = responses[0]['content']
+
+        pattern = trigger['pattern']
+        trigger['_pattern_lower'] = pattern.casefold()
+        if trigger['match_type'] == 'regex':
+            if pattern in TRIVIAL_REGEX_PATTERNS:
+                trigger['_trivial_match'] = True
+                return
+            if re.escape(pattern) == pattern:
+                # No metacharacters, so a substring check gives the same result
+                trigger['match_type'] = 'partial'
+                return
+            flags = 0 if trigger['case_sensitive'] else re.IGNORECASE
+            try:
+                self.compiled[trigger['id']] = re.compile(trigger['pattern'], flags)
+            except re.error:
+                self.compiled.pop(trigger['id'], None)
+
+    def rebuild_matchers(self):
+        """
+        Regroup triggers by match type so on_message can look up exact
+        triggers by content and gate all partial triggers with one regex scan.
+        """
+        exact_triggers: Dict[str, List[Dict]] = {}
+        exact_triggers_lower: Dict[str, List[Dict]] = {}
+        partial_triggers: List[Dict] = []
+        regex_triggers: List[Dict] = []
+
+        for trigger in self.triggers:
+            match_type = trigger['match_type']
+            if match_type == 'exact':
+                if trigger['case_sensitive']:
+                    exact_triggers.setdefault(trigger['pattern'], []).append(trigger)
+                else:
+                    exact_triggers_lower.setdefault(trigger['_pattern_lower'], []).append(trigger)
+            elif match_type == 'partial':
+                partial_triggers.append(trigger)
+            elif match_type == 'regex':
+                regex_triggers.append(trigger)
+
+        # Casefolding preserves substrings, so a single union of the lowered
+        # patterns searched against the lowered message rejects messages that
+        # cannot match any partial trigger in one pass.
+        partial_matcher = None
+        if partial_triggers:
+            partial_matcher = re.compile('|'.join(
+                re.escape(t['_pattern_lower']) for t in partial_triggers))
+
+        self.exact_triggers = exact_triggers
+        self.exact_triggers_lower = exact_triggers_lower
+        self.partial_triggers = partial_triggers
+        self.partial_matcher = partial_matcher
+        self.regex_triggers = regex_triggers
 
     @app_commands.command(name="add_trigger", description="Add a new trigger")
     @app_commands.describe(pattern="The pattern to match.", response="The response to send.")
@@ -96,6 +197,13 @@ class AutoResponderCog(commands.Cog):
 
         Match type is optional and defaults to 'exact'.
         """
+        if match_type == 'regex':
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                await interaction.response.send_message(f"Invalid regex pattern: {e}", ephemeral=True)
+                return
+
         trigger_data = {
             'pattern': pattern,
             'match_type': match_type,
@@ -112,41 +220,60 @@ class AutoResponderCog(commands.Cog):
 
 
     async def add_trigger_to_db(self, trigger_data: dict):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                '''
-                INSERT INTO triggers (
-                    pattern, match_type, case_sensitive, responses, cooldown,
-                    channels, roles, blacklist_users, whitelist_users,
-                    creator_id, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''',
-                (
-                    trigger_data['pattern'],
-                    trigger_data['match_type'],
-                    trigger_data['case_sensitive'],
-                    json.dumps(trigger_data['responses']),
-                    trigger_data['cooldown'],
-                    json.dumps(trigger_data.get('channels', [])),
-                    json.dumps(trigger_data.get('roles', [])),
-                    json.dumps(trigger_data.get('blacklist_users', [])),
-                    json.dumps(trigger_data.get('whitelist_users', [])),
-                    1,  # Example: Use creator_id as 1 for now
-                    datetime.utcnow().isoformat()))
-            await db.commit()
+        trigger_data.setdefault('channels', [])
+        trigger_data.setdefault('roles', [])
+        trigger_data.setdefault('blacklist_users', [])
+        trigger_data.setdefault('whitelist_users', [])
+        trigger_data['creator_id'] = 1  # Example: Use creator_id as 1 for now
+        trigger_data['created_at'] = datetime.utcnow()
+
+        await self._ready.wait()
+        db = self.db
+        cursor = await db.execute(
+            '''
+            INSERT INTO triggers (
+                pattern, match_type, case_sensitive, responses, cooldown,
+                channels, roles, blacklist_users, whitelist_users,
+                creator_id, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''',
+            (
+                trigger_data['pattern'],
+                trigger_data['match_type'],
+                trigger_data['case_sensitive'],
+                orjson.dumps(trigger_data['responses']).decode(),
+                trigger_data['cooldown'],
+                orjson.dumps(trigger_data['channels']).decode(),
+                orjson.dumps(trigger_data['roles']).decode(),
+                orjson.dumps(trigger_data['blacklist_users']).decode(),
+                orjson.dumps(trigger_data['whitelist_users']).decode(),
+                trigger_data['creator_id'],
+                trigger_data['created_at'].isoformat()))
+        await db.commit()
+
+        trigger_data['id'] = cursor.lastrowid
+        self.prepare_trigger(trigger_data)
+        self.triggers.append(trigger_data)
+        self.rebuild_matchers()
 
     @app_commands.command(name="delete_trigger",
                           description="Delete a trigger")
     async def delete_trigger(self, interaction: discord.Interaction,
                              pattern: str):
         """Delete a trigger"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('DELETE FROM triggers WHERE pattern = ?',
-                             (pattern, ))
-            await db.commit()
-
-        if pattern in self.cache:
-            del self.cache[pattern]
+        await self._ready.wait()
+        db = self.db
+        async with db.execute('SELECT id FROM triggers WHERE pattern = ?',
+                              (pattern, )) as cursor:
+            trigger_ids = [row[0] for row in await cursor.fetchall()]
+        await db.execute('DELETE FROM triggers WHERE pattern = ?',
+                         (pattern, ))
+        await db.commit()
+
+        for trigger_id in trigger_ids:
+            self.compiled.pop(trigger_id, None)
+        self.triggers = [t for t in self.triggers if t['pattern'] != pattern]
+        self.rebuild_matchers()
 
         await interaction.response.send_message(
             f"Trigger '{pattern}' deleted successfully!")
@@ -155,10 +282,11 @@ class AutoResponderCog(commands.Cog):
                           description="List all triggers")
     async def list_triggers(self, interaction: discord.Interaction):
         """List all triggers"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                    'SELECT pattern, match_type FROM triggers') as cursor:
-                triggers = await cursor.fetchall()
+        await self._ready.wait()
+        db = self.db
+        async with db.execute(
+                'SELECT pattern, match_type FROM triggers') as cursor:
+            triggers = await cursor.fetchall()
 
         if not triggers:
             await interaction.response.send_message("No triggers found.")
@@ -174,75 +302,120 @@ class AutoResponderCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        if message.author.bot:
+        if message.author.bot or not self.triggers:
             return
 
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute('SELECT * FROM triggers') as cursor:
-                async for row in cursor:
-                    trigger = await self.get_trigger(row[1])
-
-                    if not self.match_trigger(trigger, message.content):
-                        continue
-
-                    # Check permissions and restrictions
-                    if trigger[
-                            'channels'] and message.channel.id not in trigger[
-                                'channels']:
-                        continue
-
-                    if trigger['roles'] and not any(
-                            role.id in trigger['roles']
-                            for role in message.author.roles):
-                        continue
-
-                    if message.author.id in trigger['blacklist_users']:
-                        continue
-
-                    if trigger[
-                            'whitelist_users'] and message.author.id not in trigger[
-                                'whitelist_users']:
-                        continue
-
-                    # Select and create response
-                    response_data = random.choice(trigger['responses'])
-                    response = await self.create_response(
-                        response_data, message)
-
-                    # Log trigger usage
-                    await db.execute(
-                        '''
-                        INSERT INTO logs (trigger_id, user_id, channel_id, timestamp)
-                        VALUES (?, ?, ?, ?)
-                    ''', (trigger['id'], message.author.id, message.channel.id,
-                          datetime.utcnow().isoformat()))
-                    await db.commit()
-
-                    # Send response immediately (no waiting)
-                    if isinstance(response, str):
-                        await message.channel.send(response)
-                    else:
-                        await message.channel.send(embed=response)
-
-    def match_trigger(self, trigger, message_content: str) -> bool:
-        """Check if the message matches the trigger pattern."""
-        pattern = trigger['pattern']
+        content = message.content
+        content_lower = content.casefold()
+        for trigger in self.candidate_triggers(content, content_lower):
+            # Check permissions and restrictions
+            if trigger['channels'] and message.channel.id not in trigger['channels']:
+                continue
+
+            if trigger['roles'] and trigger['roles'].isdisjoint(message.author._roles):
+                continue
+
+            if message.author.id in trigger['blacklist_users']:
+                continue
+
+            if trigger['whitelist_users'] and message.author.id not in trigger['whitelist_users']:
+                continue
+
+            # Queue trigger usage for the next batched log write
+            self._log_queue.append(
+                (trigger['id'], message.author.id, message.channel.id,
+                 datetime.utcnow().isoformat()))
+
+            fast_response = trigger.get('_fast_response')
+            if fast_response is not None:
+                await message.channel.send(fast_response)
+                continue
+
+            # Select and create response
+            response_data = random.choice(trigger['responses'])
+            response = await self.create_response(response_data, message)
+
+            # Send response immediately (no waiting)
+            if isinstance(response, str):
+                await message.channel.send(response)
+            else:
+                await message.channel.send(embed=response)
+
+    @tasks.loop(seconds=LOG_FLUSH_INTERVAL)
+    async def flush_logs(self):
+        """Periodically write queued trigger usage logs in one batch."""
+        # An exception escaping a tasks.loop stops it for good
+        try:
+            await self.write_pending_logs()
+        except Exception as e:
+            logging.error(f"Failed to write autoresponder logs, retrying next flush: {e}")
+
+    async def write_pending_logs(self):
+        """Drain the log queue and insert everything with a single commit."""
+        if not self._log_queue:
+            return
+        # Swap the list out first so hits logged during the write are kept
+        entries, self._log_queue = self._log_queue, []
+
+        await self._ready.wait()
+        db = self.db
+        try:
+            await db.executemany(
+                '''
+                INSERT INTO logs (trigger_id, user_id, channel_id, timestamp)
+                VALUES (?, ?, ?, ?)
+            ''', entries)
+            await db.commit()
+        except Exception:
+            # Put the batch back ahead of newer hits, bounded so a broken database can't grow it forever
+            self._log_queue = (entries + self._log_queue)[-LOG_QUEUE_MAX:]
+            await db.rollback()
+            raise
+
+    def candidate_triggers(self, content: str, content_lower: str) -> List[Dict]:
+        """Return the triggers matching the message content, in creation order."""
+        candidates = list(self.exact_triggers.get(content, ()))
+        candidates.extend(self.exact_triggers_lower.get(content_lower, ()))
+
+        if self.partial_matcher and self.partial_matcher.search(content_lower):
+            candidates.extend(t for t in self.partial_triggers if self.match_trigger(t, content, content_lower))
+
+        candidates.extend(t for t in self.regex_triggers if self.match_trigger(t, content, content_lower))
+        candidates.sort(key=lambda t: t['id'])
+        return candidates
+
+    def match_trigger(self, trigger, message_content: str, content_lower: str) -> bool:
+        """
+        Check if the message matches the trigger pattern.
+        `content_lower` is the casefolded message, computed once per message.
+        """
         match_type = trigger['match_type']
-        case_sensitive = trigger['case_sensitive']
 
-        if not case_sensitive:
-            message_content = message_content.lower()
-            pattern = pattern.lower()
+        if match_type == 'regex':
+            if trigger.get('_trivial_match'):
+                # '.*' matches anything; '.' and '.+' need one non-newline character
+                return trigger['pattern'] == '.*' or message_content.strip('\n') != ''
+
+            # Repeated messages (spam, "lol" floods) reuse the previous result
+            last_match = trigger.get('_last_match')
+            if last_match and last_match[0] == message_content:
+                return last_match[1]
+
+            compiled = self.compiled.get(trigger['id'])
+            matched = compiled is not None and compiled.search(message_content) is not None
+            trigger['_last_match'] = (message_content, matched)
+            return matched
+
+        if trigger['case_sensitive']:
+            pattern = trigger['pattern']
+        else:
+            message_content = content_lower
+            pattern = trigger['_pattern_lower']
 
         if match_type == 'exact':
             return message_content == pattern
         elif match_type == 'partial':
             return pattern in message_content
-        elif match_type == 'regex':
-            try:
-                return bool(re.search(pattern, message_content))
-            except re.error:
-                return False
         return False
 
     async def create_response(self, response_data: dict,
@@ -112,14 +112,13 @@ class ConfessionModal(discord.ui.Modal):
         self.add_item(self.confession_input)
         self.add_item(self.attachment_url)
 
-    async def download_attachment(self, url):
+    async def download_attachment(self, session: aiohttp.ClientSession, url):
         """Download an image from a URL"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    return None
-                data = await resp.read()
-                return discord.File(io.BytesIO(data), filename="attachment.png")
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                return None
+            data = await resp.read()
+            return discord.File(io.BytesIO(data), filename="attachment.png")
 
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
@@ -147,7 +146,7 @@ class ConfessionModal(discord.ui.Modal):
         # Download attachment if provided
         file = None
         if self.attachment_url.value:
-            file = await self.download_attachment(self.attachment_url.value)
+            file = await self.download_attachment(interaction.client.http_session, self.attachment_url.value)
 
         # Create embed
         embed = discord.Embed(
@@ -211,7 +210,12 @@ class Confessions(commands.Cog):
         bot.add_view(ConfessionView())  # Persistent view registration
 
     async def cog_load(self):
+        # Cogs load in setup_hook before the gateway connects, so restore once ready
+        self.bot.loop.create_task(self.restore_views())
+
+    async def restore_views(self):
         """Restore persistent views only for bot-authored messages"""
+        await self.bot.wait_until_ready()
         for guild in self.bot.guilds:
             try:
                 guild_settings = self.config.get_guild_settings(str(guild.id))
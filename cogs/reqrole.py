@@ -6,7 +6,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import asyncio
 import re
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, Any, FrozenSet
+from dataclasses import dataclass, field, replace
 import functools
 import logging.handlers
 
@@ -36,19 +37,33 @@ MIN_ROLE_LIMIT = 1
 EMOJI_SUCCESS = "<a:sukoon_whitetick:1323992464058482729>"
 EMOJI_INFO = "<:sukoon_info:1323251063910043659>"
 
+_SANITIZE_RE = re.compile(r'[^a-z0-9]')
+
+@functools.lru_cache(maxsize=1024)
+def _sanitize(name: str) -> str:
+    """Strip everything but lowercase letters and digits from a role name."""
+    return _SANITIZE_RE.sub('', name.lower())
+
+@dataclass(slots=True)
 class RoleManagementConfig:
     """Immutable configuration for a guild's role management."""
-    def __init__(self, 
-                 guild_id: int, 
-                 reqrole_id: Optional[int] = None, 
-                 role_mappings: Dict[str, int] = None, 
-                 log_channel_id: Optional[int] = None, 
-                 role_assignment_limit: int = DEFAULT_ROLE_LIMIT):
-        self.guild_id = guild_id
-        self.reqrole_id = reqrole_id
-        self.role_mappings = role_mappings or {}
-        self.log_channel_id = log_channel_id
-        self.role_assignment_limit = max(MIN_ROLE_LIMIT, min(role_assignment_limit, MAX_ROLE_LIMIT))
+    guild_id: int
+    reqrole_id: Optional[int] = None
+    role_mappings: Dict[str, int] = None
+    log_channel_id: Optional[int] = None
+    role_assignment_limit: int = DEFAULT_ROLE_LIMIT
+    mapped_ids: FrozenSet[int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.role_mappings = self.role_mappings or {}
+        self.role_assignment_limit = max(MIN_ROLE_LIMIT, min(self.role_assignment_limit, MAX_ROLE_LIMIT))
+        self.mapped_ids = frozenset(self.role_mappings.values())
+
+async def _dynamic_role_command(ctx, member: discord.Member = None):
+    """Shared callback for every dynamic role command."""
+    cog = ctx.bot.get_cog("RoleManagement")
+    if cog:
+        await cog.handle_dynamic_role_command(ctx, member, ctx.command.extras["role_id"])
 
 class RoleManagement(commands.Cog):
     def __init__(self, bot):
@@ -60,28 +75,37 @@ class RoleManagement(commands.Cog):
         # Thread-safe configuration cache with size limit
         self.guild_configs: Dict[int, RoleManagementConfig] = {}
         self.config_lock = asyncio.Lock()
-        self.dynamic_commands: Dict[int, List[str]] = {}
+        self.pending_loads: Dict[int, asyncio.Future] = {}
+        # Registered dynamic command name -> role id, per guild
+        self.dynamic_commands: Dict[int, Dict[str, int]] = {}
 
         # Periodic cleanup and configuration loading
         self.bot.loop.create_task(self.periodic_config_cleanup())
         self.bot.loop.create_task(self.initial_config_load())
 
-    @functools.lru_cache(maxsize=100)
     def sanitize_role_name(self, name: str) -> str:
         """Cached and consistent role name sanitization."""
-        return re.sub(r'[^a-z0-9]', '', name.lower())
+        return _sanitize(name)
 
     async def initial_config_load(self):
-        """Load configurations for all current guilds on bot startup."""
+        """Warm the cache for all current guilds with a single query on bot startup."""
+        await self.bot.wait_until_ready()
         try:
-            for guild in self.bot.guilds:
-                await self.load_guild_config(guild.id)
-            logger.info(f"Loaded configurations for {len(self.bot.guilds)} guilds")
+            guild_ids = [guild.id for guild in self.bot.guilds]
+            configs = [
+                self.config_from_document(config_data["guild_id"], config_data)
+                async for config_data in self.config_collection.find({"guild_id": {"$in": guild_ids}})
+            ]
+            async with self.config_lock:
+                for config in configs:
+                    self.guild_configs.setdefault(config.guild_id, config)
+            logger.info(f"Loaded configurations for {len(configs)} of {len(guild_ids)} guilds")
         except Exception as e:
             logger.error(f"Initial configuration load error: {e}")
 
     async def periodic_config_cleanup(self):
         """Periodically clean up configurations for guilds bot is no longer in."""
+        await self.bot.wait_until_ready()
         while True:
             try:
                 async with self.config_lock:
@@ -103,63 +127,76 @@ class RoleManagement(commands.Cog):
             # Run cleanup every 12 hours
             await asyncio.sleep(12 * 60 * 60)
 
+    def config_from_document(self, guild_id: int, config_data: Dict[str, Any]) -> RoleManagementConfig:
+        """Validate and sanitize a stored configuration document."""
+        return RoleManagementConfig(
+            guild_id=guild_id,
+            reqrole_id=config_data.get("reqrole_id"),
+            role_mappings=config_data.get("role_mappings", {}),
+            log_channel_id=config_data.get("log_channel_id"),
+            role_assignment_limit=config_data.get("role_assignment_limit", DEFAULT_ROLE_LIMIT)
+        )
+
     async def load_guild_config(self, guild_id: int) -> RoleManagementConfig:
         """
         Safely load or create guild configuration with comprehensive validation.
+        Cache hits skip the lock; concurrent misses for a guild share one query.
         """
-        async with self.config_lock:
-            # Check if configuration exists in cache
-            if guild_id in self.guild_configs:
-                return self.guild_configs[guild_id]
+        config = self.guild_configs.get(guild_id)
+        if config is not None:
+            return config
 
-            # Fetch from database or create default
-            try:
-                config_data = await self.config_collection.find_one({"guild_id": guild_id}) or {}
+        pending = self.pending_loads.get(guild_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self.fetch_guild_config(guild_id))
+            self.pending_loads[guild_id] = pending
+            pending.add_done_callback(lambda _: self.pending_loads.pop(guild_id, None))
 
-                # Validate and sanitize configuration data
-                config = RoleManagementConfig(
-                    guild_id=guild_id,
-                    reqrole_id=config_data.get("reqrole_id"),
-                    role_mappings=config_data.get("role_mappings", {}),
-                    log_channel_id=config_data.get("log_channel_id"),
-                    role_assignment_limit=config_data.get("role_assignment_limit", DEFAULT_ROLE_LIMIT)
-                )
+        # Shield so one cancelled caller does not abort the shared load
+        return await asyncio.shield(pending)
 
-                self.guild_configs[guild_id] = config
-                return config
+    async def fetch_guild_config(self, guild_id: int) -> RoleManagementConfig:
+        """Fetch guild configuration from the database or create a default."""
+        try:
+            config_data = await self.config_collection.find_one({"guild_id": guild_id}) or {}
+            config = self.config_from_document(guild_id, config_data)
+        except Exception as e:
+            logger.error(f"Configuration loading error for guild {guild_id}: {e}")
+            # Fallback to default configuration
+            config = RoleManagementConfig(guild_id=guild_id)
 
-            except Exception as e:
-                logger.error(f"Configuration loading error for guild {guild_id}: {e}")
-                # Fallback to default configuration
-                default_config = RoleManagementConfig(guild_id=guild_id)
-                self.guild_configs[guild_id] = default_config
-                return default_config
+        async with self.config_lock:
+            # Keep a config saved while the query was in flight
+            return self.guild_configs.setdefault(guild_id, config)
 
-    async def save_guild_config(self, config: RoleManagementConfig):
+    async def save_guild_config(self, config: RoleManagementConfig, changed: Optional[Dict[str, Any]] = None):
         """
         Comprehensive configuration saving with advanced error handling.
+        Only the fields in `changed` are written; without it every field is saved.
         """
         try:
-            async with self.config_lock:
-                # Validate configuration before saving
-                config_dict = {
-                    "guild_id": config.guild_id,
+            # Validate configuration before saving
+            if changed is None:
+                changed = {
                     "reqrole_id": config.reqrole_id,
                     "role_mappings": config.role_mappings,
                     "log_channel_id": config.log_channel_id,
                     "role_assignment_limit": config.role_assignment_limit
                 }
 
-                await self.config_collection.replace_one(
-                    {"guild_id": config.guild_id}, 
-                    config_dict, 
-                    upsert=True
-                )
+            # The database round trip runs outside the lock so it never blocks other guilds
+            await self.config_collection.update_one(
+                {"guild_id": config.guild_id},
+                {"$set": changed, "$setOnInsert": {"guild_id": config.guild_id}},
+                upsert=True
+            )
 
-                # Update in-memory cache
+            # Update in-memory cache
+            async with self.config_lock:
                 self.guild_configs[config.guild_id] = config
 
-                # Regenerate dynamic commands
+            # Regenerate dynamic commands only when the mappings differ from what is registered
+            if self.dynamic_commands.get(config.guild_id) != config.role_mappings:
                 self.generate_dynamic_commands(config)
 
         except Exception as e:
@@ -168,96 +205,85 @@ class RoleManagement(commands.Cog):
     def generate_dynamic_commands(self, config: RoleManagementConfig):
         """
         Advanced dynamic command generation with better error handling.
+        Only commands whose mapping was added, removed or changed are touched.
         """
-        # Remove previous dynamic commands for this guild
-        if config.guild_id in self.dynamic_commands:
-            for cmd_name in self.dynamic_commands[config.guild_id]:
-                self.bot.remove_command(cmd_name)
-            del self.dynamic_commands[config.guild_id]
-
-        self.dynamic_commands[config.guild_id] = []
-
-        for custom_name, role_id in config.role_mappings.items():
-            # Create a closure to capture the specific role_id and custom_name
-            def create_dynamic_command(specific_role_id, specific_custom_name):
-                async def dynamic_role_command(ctx, member: discord.Member = None):
-                    # Validate required role
-                    if not await self.check_required_role(ctx, config):
-                        return
-
-                    # Validate member
-                    if not member:
-                        await ctx.send(embed=discord.Embed(
-                            description=f"{EMOJI_INFO} | Please mention a user to assign or remove the role.",
-                            color=EMBED_COLOR))
-                        return
-
-                    # Find the role
-                    role = ctx.guild.get_role(specific_role_id)
-                    if not role:
-                        await ctx.send(embed=discord.Embed(
-                            description=f"{EMOJI_INFO} | The role no longer exists.",
-                            color=EMBED_COLOR))
-                        return
-
-                    # Check role assignment limit
-                    if not await self.check_role_assignment_limit(ctx, member, config):
-                        return
-
-                    # Perform role action
-                    try:
-                        action = "added" if role not in member.roles else "removed"
-                        if action == "added":
-                            await member.add_roles(role)
-                        else:
-                            await member.remove_roles(role)
-
-                        # Send success message
-                        await ctx.send(embed=discord.Embed(
-                            description=f"{EMOJI_SUCCESS} | Role '{role.name}' has been {action} to {member.mention}.",
-                            color=EMBED_COLOR))
-
-                        # Log the action
-                        await self.log_role_action(ctx, member, role, action, config)
-
-                    except discord.Forbidden:
-                        await ctx.send(embed=discord.Embed(
-                            description=f"{EMOJI_INFO} | Insufficient permissions to manage roles.",
-                            color=EMBED_COLOR))
-                    except discord.HTTPException:
-                        await ctx.send(embed=discord.Embed(
-                            description=f"{EMOJI_INFO} | Failed to manage roles.",
-                            color=EMBED_COLOR))
-
-                return dynamic_role_command
-
-            # Register dynamic command
-            cmd = commands.command(name=custom_name)(create_dynamic_command(role_id, custom_name))
+        registered = self.dynamic_commands.setdefault(config.guild_id, {})
+        mappings = config.role_mappings
+        added = mappings.keys() - registered.keys()
+        removed = registered.keys() - mappings.keys()
+        changed = {name for name in mappings.keys() & registered.keys() if mappings[name] != registered[name]}
+
+        # Remove stale dynamic commands for this guild
+        for cmd_name in removed | changed:
+            self.bot.remove_command(cmd_name)
+            del registered[cmd_name]
+
+        for custom_name in added | changed:
+            role_id = mappings[custom_name]
+            # Register dynamic command; the role it manages travels in extras
+            cmd = commands.Command(_dynamic_role_command, name=custom_name, extras={"role_id": role_id})
             self.bot.add_command(cmd)
-            self.dynamic_commands[config.guild_id].append(custom_name)
+            registered[custom_name] = role_id
 
-    async def check_required_role(self, ctx, config: RoleManagementConfig) -> bool:
-        """Check if user has the required role."""
-        if not config.reqrole_id:
+    async def handle_dynamic_role_command(self, ctx, member: Optional[discord.Member], role_id: int):
+        """Toggle a mapped role on a member, reading the guild config at call time."""
+        config = self.guild_configs.get(ctx.guild.id) or await self.load_guild_config(ctx.guild.id)
+
+        # Validate required role
+        if not await self.check_required_role(ctx, config):
+            return
+
+        # Validate member
+        if not member:
             await ctx.send(embed=discord.Embed(
-                description=f"{EMOJI_INFO} | No required role set for this server.",
+                description=f"{EMOJI_INFO} | Please mention a user to assign or remove the role.",
                 color=EMBED_COLOR))
-            return False
+            return
 
-        if config.reqrole_id not in [role.id for role in ctx.author.roles]:
+        # Find the role
+        role = ctx.guild.get_role(role_id)
+        if not role:
             await ctx.send(embed=discord.Embed(
-                description=f"{EMOJI_INFO} | You lack the required role.",
+                description=f"{EMOJI_INFO} | The role no longer exists.",
                 color=EMBED_COLOR))
-            return False
+            return
 
-        return True
+        # Check role assignment limit
+        if not await self.check_role_assignment_limit(ctx, member, config):
+            return
+
+        # Perform role action
+        try:
+            action = "added" if role not in member.roles else "removed"
+            if action == "added":
+                await member.add_roles(role)
+            else:
+                await member.remove_roles(role)
+
+            # Send success message
+            await ctx.send(embed=discord.Embed(
+                description=f"{EMOJI_SUCCESS} | Role '{role.name}' has been {action} to {member.mention}.",
+                color=EMBED_COLOR))
+
+            # Log the action
+            await self.log_role_action(ctx, member, role, action, config)
+
+        except discord.Forbidden:
+            await ctx.send(embed=discord.Embed(
+                description=f"{EMOJI_INFO} | Insufficient permissions to manage roles.",
+                color=EMBED_COLOR))
+        except discord.HTTPException:
+            await ctx.send(embed=discord.Embed(
+                description=f"{EMOJI_INFO} | Failed to manage roles.",
+                color=EMBED_COLOR))
 
     async def check_role_assignment_limit(self, ctx, member: discord.Member, config: RoleManagementConfig) -> bool:
         """Check if member can receive another role."""
-        mapped_role_ids = list(config.role_mappings.values())
-        current_mapped_roles = [r for r in member.roles if r.id in mapped_role_ids]
+        # Member._roles holds the raw role ids, so no Role objects are built
+        mapped_ids = config.mapped_ids
+        count = sum(1 for role_id in member._roles if role_id in mapped_ids)
 
-        if len(current_mapped_roles) >= config.role_assignment_limit:
+        if count >= config.role_assignment_limit:
             await ctx.send(embed=discord.Embed(
                 description=f"{EMOJI_INFO} | {member.mention} has reached the role limit of {config.role_assignment_limit}.",
                 color=EMBED_COLOR))
@@ -286,7 +312,7 @@ class RoleManagement(commands.Cog):
 
             # Update the required role ID in the config
             config.reqrole_id = role.id
-            await self.save_guild_config(config)
+            await self.save_guild_config(config, {"reqrole_id": role.id})
 
             # Provide confirmation to the admin
             await ctx.send(embed=discord.Embed(
@@ -321,7 +347,8 @@ class RoleManagement(commands.Cog):
             ))
             return False
 
-        if required_role not in ctx.author.roles:
+        # SnowflakeList.has() is a binary search over the sorted role ids
+        if not ctx.author._roles.has(config.reqrole_id):
             await ctx.send(embed=discord.Embed(
                 description=f"{EMOJI_INFO} | You lack the required role (**{required_role.name}**) to use this command.",
                 color=EMBED_COLOR
@@ -337,17 +364,8 @@ class RoleManagement(commands.Cog):
         config = await self.load_guild_config(ctx.guild.id)
         sanitized_name = self.sanitize_role_name(custom_name)
 
-        role_mappings = config.role_mappings.copy()
-        role_mappings[sanitized_name] = role.id
-
-        new_config = RoleManagementConfig(
-            guild_id=config.guild_id,
-            reqrole_id=config.reqrole_id,
-            role_mappings=role_mappings,
-            log_channel_id=config.log_channel_id,
-            role_assignment_limit=config.role_assignment_limit
-        )
-        await self.save_guild_config(new_config)
+        new_config = replace(config, role_mappings={**config.role_mappings, sanitized_name: role.id})
+        await self.save_guild_config(new_config, {"role_mappings": new_config.role_mappings})
 
         await ctx.send(embed=discord.Embed(
             description=f"{EMOJI_SUCCESS} | Mapped '{sanitized_name}' to {role.name}.",
@@ -358,14 +376,8 @@ class RoleManagement(commands.Cog):
     async def setlogchannel(self, ctx, channel: discord.TextChannel):
         """Set the channel for logging role actions."""
         config = await self.load_guild_config(ctx.guild.id)
-        new_config = RoleManagementConfig(
-            guild_id=config.guild_id,
-            reqrole_id=config.reqrole_id,
-            role_mappings=config.role_mappings,
-            log_channel_id=channel.id,
-            role_assignment_limit=config.role_assignment_limit
-        )
-        await self.save_guild_config(new_config)
+        new_config = replace(config, log_channel_id=channel.id)
+        await self.save_guild_config(new_config, {"log_channel_id": channel.id})
         await ctx.send(embed=discord.Embed(
             description=f"{EMOJI_SUCCESS} | Log channel set to {channel.name}.",
             color=EMBED_COLOR))
@@ -381,14 +393,8 @@ class RoleManagement(commands.Cog):
             return
 
         config = await self.load_guild_config(ctx.guild.id)
-        new_config = RoleManagementConfig(
-            guild_id=config.guild_id,
-            reqrole_id=config.reqrole_id,
-            role_mappings=config.role_mappings,
-            log_channel_id=config.log_channel_id,
-            role_assignment_limit=limit
-        )
-        await self.save_guild_config(new_config)
+        new_config = replace(config, role_assignment_limit=limit)
+        await self.save_guild_config(new_config, {"role_assignment_limit": new_config.role_assignment_limit})
         await ctx.send(embed=discord.Embed(
             description=f"{EMOJI_SUCCESS} | Role assignment limit set to {limit}.",
             color=EMBED_COLOR))
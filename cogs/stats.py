@@ -181,7 +181,7 @@ class AdvancedBotStats(commands.Cog):
             uptime = datetime.datetime.utcnow() - self.bot.start_time
             embed.add_field(name="Uptime", value=f"```\n{humanize.precisedelta(uptime)}```", inline=False)
             embed.add_field(name="Servers", value=f"```\n{len(self.bot.guilds):,}```", inline=True)
-            embed.add_field(name="Users", value=f"```\n{len(self.bot.users):,}```", inline=True)
+            embed.add_field(name="Users", value=f"```\n{sum(g.member_count or 0 for g in self.bot.guilds):,}```", inline=True)
             embed.add_field(name="Channels", value=f"```\n{sum(len(g.channels) for g in self.bot.guilds):,}```", inline=True)
             embed.add_field(name="Commands", value=f"```\n{len(self.bot.commands):,}```", inline=True)
             embed.add_field(name="Threads", value=f"```\n{latest.process_threads}```", inline=True)
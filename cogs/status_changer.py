@@ -35,6 +35,10 @@ class StatusCog(commands.Cog):
         except Exception as e:
             logging.error(f"Unexpected error occurred while cycling status: {e}")
 
+    @status_cycle.before_loop
+    async def before_status_cycle(self):
+        await self.bot.wait_until_ready()
+
     async def change_status(self, message):
         """Changes the bot's status and custom status message."""
         try:
@@ -14,7 +14,7 @@ EMBED_COLOR = discord.Color.from_rgb(47, 49, 54)  # #2f3136
 class StealEmoji(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.session = aiohttp.ClientSession()
+        self.session = bot.http_session  # Shared session, closed by main.py
 
     @commands.command(name="steal")
     @commands.has_permissions(manage_emojis_and_stickers=True)  # Only users with the 'Manage Emojis and Stickers' permission can use this command
@@ -141,10 +141,6 @@ class StealEmoji(commands.Cog):
             counter += 1
         return unique_name
 
-    def cog_unload(self):
-        """Close aiohttp session when the cog is unloaded."""
-        self.bot.loop.create_task(self.session.close())
-
     async def handle_bot_error(self, ctx, error_message):
         """Handle bot-specific errors like 'Maximum number of stickers reached'."""
         # Send the error message
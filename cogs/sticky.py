@@ -73,16 +73,17 @@ class StickyBot(commands.Cog):
                 await confirmation_message.add_reaction("✅")
                 await confirmation_message.add_reaction("❌")
 
-                def reaction_check(reaction, user):
+                # Raw event: reaction_add is only dispatched for cached messages
+                def reaction_check(payload):
                     return (
-                        user == ctx.author
-                        and str(reaction.emoji) in ["✅", "❌"]
-                        and reaction.message.id == confirmation_message.id
+                        payload.user_id == ctx.author.id
+                        and str(payload.emoji) in ["✅", "❌"]
+                        and payload.message_id == confirmation_message.id
                     )
 
                 try:
-                    reaction, _ = await self.bot.wait_for("reaction_add", timeout=30.0, check=reaction_check)
-                    if str(reaction.emoji) == "❌":
+                    payload = await self.bot.wait_for("raw_reaction_add", timeout=30.0, check=reaction_check)
+                    if str(payload.emoji) == "❌":
                         await ctx.send("Keeping the old sticky message.")
                         await confirmation_message.delete()
                         return
@@ -1,15 +1,22 @@
-from flask import Flask
-import threading
+from aiohttp import web
 
-app = Flask('')
+_runner = None
 
-@app.route('/')
-def home():
-    return "Bot is running!"
+async def health(request):
+    return web.Response(text="ok")
 
-def run():
-    app.run(host='0.0.0.0', port=8080)
+async def keep_alive():
+    """Serve the health route on port 8080 from the running event loop."""
+    global _runner
+    app = web.Application()
+    app.router.add_get('/', health)
+    _runner = web.AppRunner(app)
+    await _runner.setup()
+    await web.TCPSite(_runner, '0.0.0.0', 8080).start()
 
-def keep_alive():
-    thread = threading.Thread(target=run)
-    thread.start()
+async def stop_keep_alive():
+    """Close the health server if it was started."""
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -1,86 +1,187 @@
 import discord
 from discord.ext import commands, tasks
 import logging
+import logging.handlers
 import os
+import queue
+import atexit
 from dotenv import load_dotenv
-from keep_alive import keep_alive  # Flask server to keep bot alive if needed
+from keep_alive import keep_alive, stop_keep_alive  # HTTP ping endpoint for Replit
 import asyncio
+import aiohttp
+import hashlib
+import json
+import random
+import signal
+import pkgutil
+import cogs as cogs_pkg
+
+try:
+    import uvloop  # libuv-based event loop, not available on Windows
+except ImportError:
+    uvloop = None
 
 # Load environment variables
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+FORCE_SYNC = os.getenv("FORCE_SYNC") == "1"  # Sync slash commands even if unchanged
+
+# Hash of the last command tree synced with Discord
+SYNC_HASH_FILE = ".sync_hash"
 
 if not DISCORD_TOKEN:
     raise ValueError("No DISCORD_TOKEN found in .env file")
 
-# Set up logging
-logging.basicConfig(filename='bot.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# Intents setup
-intents = discord.Intents.default()
+# Set up logging: the event loop only enqueues records, a listener thread writes bot.log
+log_queue = queue.Queue(-1)
+file_handler = logging.FileHandler('bot.log')
+file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(log_queue)])
+
+# Intents setup: only what the loaded cogs use
+intents = discord.Intents.none()
+intents.guilds = True
 intents.members = True
+intents.guild_messages = True
+intents.dm_messages = True  # Prefix commands in DMs
 intents.message_content = True  # Enable Message Content Intent
-
-bot = commands.Bot(command_prefix=".", intents=intents)
-
-# List of cogs to load
+intents.guild_reactions = True  # Giveaway entries
+intents.voice_states = True  # Drag-me voice moves
+intents.emojis_and_stickers = True  # Keeps guild.emojis current for steal
+
+# Cache members only while they are in voice (needed for member.voice); others are fetched on demand
+member_cache_flags = discord.MemberCacheFlags.none()
+member_cache_flags.voice = True
+
+PREFIX = "."
+
+def command_prefix(bot, message):
+    """Use "." as the prefix, ignoring messages that start with ".." (incorrect prefix)."""
+    return PREFIX if not message.content.startswith("..") else "\x00"  # Unmatchable sentinel
+
+# Number of gateway shards; unset lets Discord recommend a count
+SHARDS = os.getenv("SHARDS")
+
+bot = commands.AutoShardedBot(
+    command_prefix=command_prefix,
+    shard_count=int(SHARDS) if SHARDS else None,
+    intents=intents,
+    member_cache_flags=member_cache_flags,
+    chunk_guilds_at_startup=False,
+    max_messages=None,  # No message cache; reaction waits use raw events
+)
+
+# REST rate-limit backoff, on top of the 5 retries discord.py already makes per request
+RATE_LIMIT_MAX_ATTEMPTS = 3
+RATE_LIMIT_JITTER = 1.0  # seconds
+RATE_LIMIT_MAX_DELAY = 30.0  # seconds
+
+_http_request = bot.http.request
+
+async def request_with_backoff(route, **kwargs):
+    """Retry REST requests that still end in a 429 with exponential backoff and jitter."""
+    for attempt in range(RATE_LIMIT_MAX_ATTEMPTS):
+        try:
+            return await _http_request(route, **kwargs)
+        except discord.HTTPException as e:
+            if e.status != 429 or attempt == RATE_LIMIT_MAX_ATTEMPTS - 1:
+                raise
+            # A 429 without Via comes from Cloudflare (IP ban); retrying only extends it
+            if not e.response.headers.get("Via"):
+                raise
+            retry_after = float(e.response.headers.get("Retry-After", 1))
+            delay = min(2 ** attempt * retry_after + random.uniform(0, RATE_LIMIT_JITTER), RATE_LIMIT_MAX_DELAY)
+            logging.warning(f"Rate-limited on {route.method} {route.path}: retrying in {delay:.2f} seconds.")
+            await asyncio.sleep(delay)
+            # Rewind attachments consumed by the failed attempt
+            for file in kwargs.get("files") or ():
+                file.reset()
+
+bot.http.request = request_with_backoff
+
+# Cogs to load: every module in the cogs package not starting with "_"
 cogs = [
-    "cogs.status_changer",
-    "cogs.dragmee",
-    "cogs.confess",
-    "cogs.afk_cog",
-    "cogs.av",
-    "cogs.giveaway",
-    "cogs.key_generator",
-    "cogs.purge",
-    "cogs.reqrole",
-    "cogs.stats",
-    "cogs.steal",
-    "cogs.sticky",
-    "cogs.thread",
-    "cogs.AvatarBannerUpdater",
-    "cogs.autoresponder",
+    f"cogs.{module.name}"
+    for module in pkgutil.iter_modules(cogs_pkg.__path__)
+    if not module.name.startswith("_")
 ]
 
 async def load_cogs():
-    """Load all specified cogs."""
-    for cog in cogs:
-        try:
-            if cog in bot.extensions:
-                await bot.unload_extension(cog)
-            await bot.load_extension(cog)
-            logging.info(f"{cog} has been loaded.")
-        except commands.errors.ExtensionNotFound:
+    """Load all specified cogs concurrently."""
+    async def _load_one(cog):
+        await bot.load_extension(cog)
+        logging.info(f"{cog} has been loaded.")
+
+    results = await asyncio.gather(*map(_load_one, cogs), return_exceptions=True)
+    for cog, result in zip(cogs, results):
+        if isinstance(result, commands.errors.ExtensionAlreadyLoaded):
+            logging.info(f"{cog} already loaded, skipping")
+        elif isinstance(result, commands.errors.NoEntryPointError):
+            logging.info(f"{cog} has no setup function, skipping")
+        elif isinstance(result, commands.errors.ExtensionNotFound):
             logging.error(f"{cog} not found. Ensure it is in the correct directory.")
-        except commands.errors.ExtensionFailed as e:
-            logging.error(f"Failed to load {cog}. Error: {e}")
+        elif isinstance(result, commands.errors.ExtensionFailed):
+            logging.error(f"Failed to load {cog}. Error: {result}")
+        elif isinstance(result, BaseException):
+            raise result
+
+def command_tree_hash():
+    """Stable hash of the slash command payload that tree.sync() would send."""
+    payload = json.dumps({
+        "application_id": bot.application_id,
+        "commands": [command.to_dict(bot.tree) for command in bot.tree.get_commands()],
+    }, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
 
 @bot.event
-async def on_ready():
-    """When the bot is ready, print the bot info, sync commands, and list registered commands."""
-    print(f'Logged in as {bot.user}')
-    
-    # Load cogs before syncing commands
+async def setup_hook():
+    """Runs once before connecting to the gateway: load cogs, sync commands, and list registered commands."""
     await load_cogs()
 
-    # Sync slash commands with Discord
+    # Replit only keeps the process alive while something answers HTTP pings
+    if os.getenv("REPL_ID"):
+        await keep_alive()
+
+    lines = []
+
+    # Sync slash commands with Discord, only when the command tree changed
     try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s)")
+        tree_hash = command_tree_hash()
+        try:
+            with open(SYNC_HASH_FILE) as file:
+                synced_hash = file.read().strip()
+        except FileNotFoundError:
+            synced_hash = None
+
+        if FORCE_SYNC or tree_hash != synced_hash:
+            synced = await bot.tree.sync()
+            with open(SYNC_HASH_FILE, "w") as file:
+                file.write(tree_hash)
+            lines.append(f"Synced {len(synced)} command(s)")
+        else:
+            lines.append("Slash commands unchanged, skipping sync")
     except Exception as e:
-        print(f"Error syncing commands: {e}")
         logging.error(f"Error syncing commands: {e}")
 
-    # Print all registered slash commands
-    print("Registered slash commands:")
-    for command in bot.tree.get_commands():
-        print(f"- {command.name}")
+    # Log all registered slash commands in a single record
+    lines.append("Registered slash commands:")
+    lines.extend(f"- {command.name}" for command in bot.tree.get_commands())
+    logging.info("\n".join(lines))
+
+@bot.event
+async def on_ready():
+    """When the bot is ready, log the bot info."""
+    logging.info(f'Logged in as {bot.user}')
 
 @bot.event
 async def on_message(message):
-    """Handle invalid commands and process commands."""
-    if message.content.startswith(".."):
-        return  # Ignore incorrect prefixes
+    """Only hand prefixed messages to the command framework."""
+    # process_commands builds a Context for every message before checking the prefix
+    if not message.content.startswith(PREFIX):
+        return
     await bot.process_commands(message)
 
 @bot.event
@@ -92,8 +193,15 @@ async def on_command_error(ctx, error):
     elif isinstance(error, commands.CommandOnCooldown):
         await ctx.send(f"Command is on cooldown. Try again in {error.retry_after:.2f} seconds.")
     else:
-        logging.error(f"Unexpected error in command {ctx.command}: {error}")
-        raise error
+        # Log the traceback once here instead of re-raising into the default handler
+        logging.exception(f"Unhandled error in command {ctx.command}", exc_info=error)
+
+async def on_app_command_error(interaction, error):
+    """Log errors raised by slash commands."""
+    command = interaction.command.qualified_name if interaction.command else None
+    logging.exception(f"Unhandled error in slash command {command}", exc_info=error)
+
+bot.tree.on_error = on_app_command_error
 
 @bot.event
 async def on_error(event, *args, **kwargs):
@@ -101,25 +209,15 @@ async def on_error(event, *args, **kwargs):
     logging.error(f"Unexpected error occurred: {event} | {args} | {kwargs}")
     print(f"Unexpected error occurred: {event}")
 
-@bot.event
-async def on_socket_response(msg):
-    """Handle rate-limiting."""
-    if msg.get('op') == 7:  # Detect rate-limiting (not guaranteed for this opcode)
-        retry_after = msg.get('d', {}).get('retry_after')
-        if retry_after:
-            logging.warning(f"Rate-limited: Retrying after {retry_after} seconds.")
-            await asyncio.sleep(retry_after)
-
 # Latency Ping Command
+_PING_PREFIX = '<a:sukoon_greendot:1322894177775783997> Latency is '
+
 @bot.command()
 @commands.cooldown(1, 5, commands.BucketType.user)
 async def ping(ctx):
     """A latency ping command."""
     latency = bot.latency  # Bot's latency in seconds
-    await ctx.send(f'<a:sukoon_greendot:1322894177775783997> Latency is {latency * 1000:.2f}ms')
-
-# Start Flask (if you want to keep the bot alive on platforms like Replit)
-keep_alive()
+    await ctx.send(_PING_PREFIX + format(latency * 1000, ".2f") + "ms")
 
 # Graceful shutdown handling
 async def shutdown():
@@ -127,8 +225,27 @@ async def shutdown():
     print("Shutting down bot...")
     await bot.close()
 
-import signal
-signal.signal(signal.SIGINT, lambda *_: asyncio.create_task(shutdown()))
+async def main():
+    """Install shutdown signal handlers, open the shared HTTP session and start the bot."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: asyncio.create_task(shutdown()))
+        except NotImplementedError:
+            pass  # Not supported on Windows; Ctrl+C still raises KeyboardInterrupt
+
+    # One pooled HTTP session for all cogs, exposed as bot.http_session; closed on exit
+    connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=75)
+    async with bot, aiohttp.ClientSession(connector=connector) as http_session:
+        bot.http_session = http_session
+        try:
+            await bot.start(DISCORD_TOKEN)
+        finally:
+            await stop_keep_alive()
 
 # Start the bot
-bot.run(DISCORD_TOKEN)
+if uvloop:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+logging.info(f"Event loop policy: {type(asyncio.get_event_loop_policy()).__name__}")
+logging.info(f"Gateway JSON decoder: {'orjson' if discord.utils.HAS_ORJSON else 'json'}")
+asyncio.run(main())